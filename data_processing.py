@@ -1,45 +1,14 @@
 import pandas as pd
-from datetime import datetime, timedelta, time
+import numpy as np
+from datetime import datetime, timedelta
 from dateutil import rrule
 import sys
 import PyPDF2 as pypdf
 import calendar
 import re
-from tqdm import tqdm
 from pprint import pprint
 from config import get_config
-
-
-"""=== Functions for statistical analysis ==="""
-
-
-def time_diff(record) -> float:
-    """ The function is considering the time interval: Start-End
-    Start and End has the format: HH:MM
-    :return hours as float rounded to 2 digits after period
-    Example:
-        8:30-12:15
-        Difference = 3.75
-    """
-    start: time = record['Start']
-    end: time = record['End']
-    date: datetime = record['Date']
-    # convert datetime.time to datetime.datetime
-    start_date = datetime(hour=start.hour, minute=start.minute, year=date.year, month=date.month, day=date.day)
-    end_date = datetime(hour=end.hour, minute=end.minute, year=date.year, month=date.month, day=date.day)
-    difference = (end_date - start_date).total_seconds()/(60*60)
-    difference = round(difference, 2)
-    return difference
-
-
-def get_students_num(record) -> int:
-    """Function tries to find the column which should include the number of the students in the venue"""
-    column_name: str = get_config()['input_student_num_col']
-    if len(column_name) == 0:
-        return 0
-    column_name = column_name.strip('()')
-    num = int(record[column_name])
-    return num
+import slot_grid as sg
 
 
 """=== Functions for formatting dataframes ==="""
@@ -63,29 +32,29 @@ def check_format(df: pd.DataFrame, required_cols: list[str]) -> None:
             break
 
 
-def split_column(df: pd.DataFrame, column_name: str, new_column_name: str, delimiter='') -> pd.DataFrame:
+def merge_shared_bookings(df: pd.DataFrame, target_column: str, delimiter=', ') -> pd.DataFrame:
     """
-    The function is copying the column and appends to the main dataframe
+    The same class is listed once per staff member, so the venue would get one booking per staff member.
+    The records which differ only by the other target columns are merged into one record
+    and the values of the other target columns are joined by the delimiter
+    Example for target column 'Venue':
+        W311 | 13:30 | IC382 | Bun
+        W311 | 13:30 | IC382 | Henry Wong
+    =>  W311 | 13:30 | IC382 | Bun, Henry Wong
     """
-    columns_to_extract = [col for col in df.columns if col != column_name]
-    # create new column
-    new_column_series: pd.Series = df.apply(lambda row: row[column_name].split(delimiter)[1], axis=1)
-    new_column_series.rename(new_column_name, inplace=True)
-    # update old column
-    date_format = "%Y-%m-%d %H:%M:%S"
-    column_series: pd.Series = df.apply(lambda row: row[column_name].split(delimiter)[0], axis=1)
-    column_series = column_series.apply(lambda value: datetime.strptime(value, date_format))
-    column_series.rename(column_name, inplace=True)
-    # add new columns to the passed dataframe
-    df = df[columns_to_extract]
-    df = df.join(new_column_series)
-    df = df.join(column_series)
-    return df
-
-
-def formatted_booking(record, time_format: str, target_column: str, columns: list[str]):
-    config_key = 'booking_format_'+target_column.lower()
-    form = get_config()[config_key]
+    other_columns: list[str] = [col for col in get_config()['target_columns'] if col != target_column]
+    key_columns: list[str] = [col for col in df.columns if col not in other_columns]
+    if len(other_columns) == 0:
+        return df
+    df = df.groupby(key_columns, sort=False, dropna=False)[other_columns].agg(
+        lambda values: delimiter.join(dict.fromkeys(values))) # unique values in original order
+    return df.reset_index()
+
+
+def formatted_booking(record, time_format: str, target_column: str, columns: list[str], form=None):
+    if form is None:
+        config_key = 'booking_format_'+target_column.lower()
+        form = get_config()[config_key]
     for key in columns:
         value = record[key]
         if type(value) != str:
@@ -99,106 +68,67 @@ def get_booking_details(df: pd.DataFrame, target_column: str, delimiter='|') ->
     The function is setting the new data cell in the format given below
     Format:
 
-    Staff Name      | Date
-    Booking detail1 | yyyy-mm-dd
-    NaN             | yyyy-mm-dd
-    Booking detail2 | yyyy-mm-dd
+    Date       | Session | Staff Name      | Staff Name(Hours)
+    yyyy-mm-dd | AM      | Booking detail1 | float
+    yyyy-mm-dd | PM      | NaN             | NaN
+    yyyy-mm-dd | AM      | Booking detail2 | float
 
     Format of Booking detail:
     'Subject Code|hh:mm-hh:mm|taskName'
 
+    The booking is shown in each time slot it overlaps, and the bookings
+    sharing the same slot are joined by the delimiter.
     """
     time_format = '%H:%M' # the time period is represented as hh:mm-hh:mm
-    formatted_bookings = {}
-    """var formatted_bookings has the following format:
-    {
-        'date|session': {
-            staff_name1: booking_detail1,
-            staff_name2: booking_detail2,
-            venue1: booking_detail1
-        }
-    }
-    NOTE: staff names and venue names are target_col variable
-    """
-    record_stats = {}
-    """ var record_stats has the following format: 
-    {
-        'date|session':
-        {
-            staff_name1 (Hours): float
-            venue1 (Hours): float
-            venue1 (Students number): int
-            staff_name2 (Hours): int
-        }
-    }
-    NOTE: staff names and venue names are target_col variable
-    """
-    total: int = df.shape[0]
-    bar_progress: tqdm = tqdm(total=total, disable=False)
-    for i in range(total):
-        record = df.iloc[i]
-        """Unpack each record"""
-        column_names: list[str] = get_config()['required_columns']
-        for col in column_names:
-            df[col].fillna(value='', inplace=True) # change NaN to '' string
-        target_col: str         = record[target_column]
-        date: datetime          = record['Date']
-        session: str            = record['Start'].strftime('%p') # AM/PM session
-        """ Format details """
-        booking_details = formatted_booking(record,
-                                            columns=df.columns,
-                                            time_format=time_format,
-                                            target_column=target_column)
-        time_difference: float = time_diff(record) # append it to the final dataframe
-        number_students: int   = get_students_num(record)
-        # booking_details += delimiter + str(time_difference) + delimiter + str(number_students)
-        key = str(date)+'|'+session
-        """ Prepare booking details """
-        entry = {target_col: booking_details}
-        if key not in formatted_bookings.keys():
-            formatted_bookings[key] = entry
-        else:
-            formatted_bookings[key].update(entry)
-
-        """ Prepare statistics """
-        entry_h = {target_col+get_config()['output_hours_num_col']: time_difference}
-        entry_num = {target_col + get_config()['output_student_num_col']: number_students}
-        if key not in record_stats.keys():
-            record_stats[key] = entry_h
-            if target_column == 'Venue':
-                record_stats[key].update(entry_num)
-        else:
-            record_stats[key].update(entry_h)
-            if target_column == 'Venue':
-                record_stats[key].update(entry_num)
-
-        bar_progress.update() # by default, updates by 1
-    bar_progress.close()
-
-    print(record_stats)
-
-    # pprint(formatted_bookings)
+    config = get_config()
+    column_names: list[str] = config['required_columns']
+    df = df.reset_index(drop=True)
+    df[column_names] = df[column_names].fillna(value='') # change NaN to '' string
+    df = merge_shared_bookings(df, target_column=target_column)
+    """ ==== Map the bookings onto the slot grid ==== """
+    slots: pd.DataFrame = sg.get_time_slots()
+    grid: dict = sg.build_slot_grid(df, target_column=target_column, slots=slots)
+    clashes: pd.DataFrame = sg.get_clashes(grid)
+    if clashes.shape[0] > 0:
+        print(f'{clashes.shape[0]} bookings overlap with another booking', file=sys.stderr)
+        print(clashes, file=sys.stderr)
+    """ ==== Format details ==== """
+    form: str = config['booking_format_'+target_column.lower()]
+    booking_details: pd.Series = df.apply(lambda record: formatted_booking(record,
+                                                                           columns=df.columns,
+                                                                           time_format=time_format,
+                                                                           target_column=target_column,
+                                                                           form=form), axis=1)
+    """ ==== Select the rows: (date, slot) with at least one booking ==== """
+    occupied: np.ndarray = grid['occupancy'] > 0
+    date_index, slot_index = np.nonzero(occupied.any(axis=0))
+    row_index = np.full(occupied.shape[1:], -1)
+    row_index[date_index, slot_index] = np.arange(len(date_index))
+    """ ==== Join the bookings sharing the same slot ==== """
+    booking_index, resource_index, booking_date_index, booking_slot_index = grid['bookings']
+    cells = pd.DataFrame({'Row': row_index[booking_date_index, booking_slot_index],
+                          'Resource': resource_index,
+                          'Text': booking_details.to_numpy()[booking_index]})
+    cells = cells.groupby(['Row', 'Resource'], sort=False)['Text'].agg(delimiter.join).reset_index()
+    text = np.full((len(date_index), len(grid['resources'])), np.nan, dtype=object)
+    text[cells['Row'].to_numpy(), cells['Resource'].to_numpy()] = cells['Text'].to_numpy()
+    """ ==== Prepare statistics ==== """
+    is_booked: np.ndarray = occupied[:, date_index, slot_index].T
+    # not rounded, so the totals do not depend on the size of the slots
+    hours: np.ndarray = np.where(is_booked, grid['minutes'][:, date_index, slot_index].T / 60, np.nan)
+    students: np.ndarray = np.where(is_booked, grid['students'][:, date_index, slot_index].T, np.nan)
     """ ==== Convert records into dataframe ==== """
-    ds = pd.DataFrame.from_records(formatted_bookings)
-    ds = ds.transpose()
-    stats_ds = pd.DataFrame.from_records(record_stats)
-    stats_ds = stats_ds.transpose()
-    print('TARGET DATAFRAME')
-    print(ds)
-    print('STATS')
-    print(stats_ds)
-    ds: pd.DataFrame = pd.merge(ds,
-                                stats_ds,
-                                left_index=True,
-                                right_index=True,
-                                how='outer')
+    columns = {'Date': grid['dates'][date_index].astype('datetime64[ns]'),
+               'Session': slots['Session'].to_numpy()[slot_index]}
+    for i, name in enumerate(grid['resources']):
+        columns[name] = text[:, i]
+        columns[name+config['output_hours_num_col']] = hours[:, i]
+        if target_column == 'Venue':
+            columns[name+config['output_student_num_col']] = students[:, i]
+    ds = pd.DataFrame(columns)
     print('RESULT')
-    ds = ds[sort_df_columns(ds)]
     print(ds.head())
-    ds.to_csv(path_or_buf=get_config()['testing_file'])
-    ds.reset_index(inplace=True)
-    ds.rename(columns={'index': 'Date'}, inplace=True)
-    ds = split_column(df=ds, column_name='Date', new_column_name='Session', delimiter='|')
+    ds.to_csv(path_or_buf=config['testing_file'])
     return ds
 
 
@@ -218,6 +148,7 @@ def get_dates_in_ac(start_year: int, start_month: int, end_year=None, end_month=
     day_name = "%a" # Friday, Monday, etc.
     # org_date_format = '%Y-%m-%d' # time format yyyy-mm-dd used in the
     """ ==== Compress the data into list[dict] ==== """
+    sessions: list[str] = list(sg.get_time_slots()['Session']) # the class sessions of each day, e.g. AM and PM
     date_values = list(dict())
     for i in range((end_date - start_date).days):
         date = start_date + timedelta(days=i)
@@ -225,8 +156,7 @@ def get_dates_in_ac(start_year: int, start_month: int, end_year=None, end_month=
         formatted_date: str = date.strftime(date_format)
         week_number: int    = get_week_num(this_day=date, start_date=start_date) # get the number of the week relative to the start day
         week_name: str      = date.strftime(day_name) # get the name of the day
-        """ ==== Compress the data into dictionary with AM and PM annotation ===== """
-        sessions = ['AM', 'PM'] # there are two class sessions per day
+        """ ==== Compress the data into dictionary with the time slot annotation ===== """
         for each_session in sessions:
             date_values.append({'Date': date,
                                 'Formatted Date': formatted_date,
@@ -236,6 +166,17 @@ def get_dates_in_ac(start_year: int, start_month: int, end_year=None, end_month=
     return pd.DataFrame(data=date_values)
 
 
+def sort_by_session(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    The rows are sorted by date and by the order of the time slots in the config file
+    The outer merge sorts the sessions alphabetically: Afternoon, Evening, Morning
+    """
+    session_order: dict = {session: i for i, session in enumerate(sg.get_time_slots()['Session'])}
+    return df.sort_values(by=['Date', 'Session'],
+                          key=lambda col: col.map(session_order) if col.name == 'Session' else col,
+                          ignore_index=True)
+
+
 def get_unique_values(df: pd.DataFrame, column_name: str) -> list[str]:
     """
     Function is looking for the names in the dataframe and
@@ -8,7 +8,7 @@ from tqdm import tqdm
 from time import time
 
 
-def autoresize_columns(worksheet: Workbook.worksheets, starting_column=None, ending_column=None, column_width=20):
+def autoresize_columns(worksheet: Workbook.worksheets, starting_column=None, ending_column=None, column_width=20, show_progress=True):
     """ The width of each column is adjusted.
     The function consider the largest width of the cell within a columns
     The starting column cannot be 0
@@ -24,7 +24,7 @@ def autoresize_columns(worksheet: Workbook.worksheets, starting_column=None, end
             raise Exception(f'Ending column cannot be bigger than {last_col}')
         last_col = ending_column
     total = last_col-first_col
-    bar: tqdm = tqdm(total=total, disable=False)
+    bar: tqdm = tqdm(total=total, disable=not show_progress)
     dim_holder = DimensionHolder(worksheet=worksheet)
     for col in range(first_col, last_col):
         bar.update()
@@ -38,11 +38,14 @@ def autoresize_columns(worksheet: Workbook.worksheets, starting_column=None, end
         dim_holder[get_column_letter(col)] = ColumnDimension(worksheet, min=col, max=col, width=column_width)
     bar.close()
     worksheet.column_dimensions = dim_holder
-    print('='*5+'DIMENSIONS OF COLUMNS HAVE BEEN RESIZED'+'='*5)
+    if show_progress:
+        print('='*5+'DIMENSIONS OF COLUMNS HAVE BEEN RESIZED'+'='*5)
 
 
-def adjust_text_alignment(worksheet: Workbook.worksheets):
-    font_size = get_config()['font_size']
+def adjust_text_alignment(worksheet: Workbook.worksheets, show_progress=True):
+    config = get_config() # read once, the config file is not parsed again for each cell
+    font_size = config['font_size']
+    colors: dict = config['cell_colors']
     header_font_color = Color(rgb=formatted_color('#ffffffff'))
     row_count: int = worksheet.max_row
     column_count: int = worksheet.max_column
@@ -60,7 +63,7 @@ def adjust_text_alignment(worksheet: Workbook.worksheets):
                          top=thin_side,
                          bottom=thin_side)
     start_time = time()
-    bar: tqdm = tqdm(total=total, disable=False)
+    bar: tqdm = tqdm(total=total, disable=not show_progress)
     col_num = 0
     for col in worksheet.columns:
         col_num += 1
@@ -75,7 +78,7 @@ def adjust_text_alignment(worksheet: Workbook.worksheets):
             is_booking: bool = (not is_public_holiday
                                 and not is_leave
                                 and cell.value is not None
-                                and col_num > get_config()['freeze_columns'])
+                                and col_num > config['freeze_columns'])
             is_column_header: bool = (row_num == 1)
 
             """ === Set text alignment === """
@@ -83,7 +86,7 @@ def adjust_text_alignment(worksheet: Workbook.worksheets):
                 worksheet[cell.coordinate].alignment = Alignment(text_rotation=90,
                                                                  vertical='center',
                                                                  horizontal='center')
-                set_column_header_color(worksheet, cell)
+                set_column_header_color(worksheet, cell, color=colors['header'])
                 set_font(cell, size=font_size, color=header_font_color)
                 continue
             worksheet[cell.coordinate].alignment = Alignment(wrap_text=True, horizontal='center')
@@ -96,19 +99,20 @@ def adjust_text_alignment(worksheet: Workbook.worksheets):
 
             """=== Set cell color ==="""
             if row_num % 2 == 0:
-                set_default_color(worksheet, cell)
+                set_default_color(worksheet, cell, color=colors['default'])
 
             """=== Set cell color by value ==="""
             if is_public_holiday:
-                set_public_holiday_color(worksheet, cell)
+                set_public_holiday_color(worksheet, cell, color=colors['public_holiday'])
             elif is_leave:
-                set_leave_color(worksheet, cell)
+                set_leave_color(worksheet, cell, color=colors['leave'])
             elif is_booking:
-                set_booking_color(worksheet, cell)
+                set_booking_color(worksheet, cell, color=colors['booking'])
                 cell.border = thin_border
     bar.close()
-    print('='*5+f'CELL STYLE HAS BEEN ADDED'+5*'=')
-    print('Time: ', time()-start_time)
+    if show_progress:
+        print('='*5+f'CELL STYLE HAS BEEN ADDED'+5*'=')
+        print('Time: ', time()-start_time)
 
 
 def formatted_color(color: str):
@@ -136,8 +140,9 @@ def convert_to_column_name(column_number: int) -> str:
     return column_name
 
 
-def set_public_holiday_color(worksheet, cell) -> None:
-    color: str = get_config()['cell_colors']['public_holiday']
+def set_public_holiday_color(worksheet, cell, color=None) -> None:
+    if color is None:
+        color: str = get_config()['cell_colors']['public_holiday']
     color = formatted_color(color)
     fill = PatternFill(start_color=color,
                        end_color=color,
@@ -153,8 +158,9 @@ def set_booking_color(worksheet, cell, color=get_config()['cell_colors']['bookin
     worksheet[cell.coordinate].fill = fill
 
 
-def set_leave_color(worksheet, cell) -> None:
-    color: str = get_config()['cell_colors']['leave']
+def set_leave_color(worksheet, cell, color=None) -> None:
+    if color is None:
+        color: str = get_config()['cell_colors']['leave']
     color = formatted_color(color)
     fill = PatternFill(start_color=color,
                        end_color=color,
@@ -162,8 +168,9 @@ def set_leave_color(worksheet, cell) -> None:
     worksheet[cell.coordinate].fill = fill
 
 
-def set_default_color(worksheet, cell) -> None:
-    color: str = get_config()['cell_colors']['default']
+def set_default_color(worksheet, cell, color=None) -> None:
+    if color is None:
+        color: str = get_config()['cell_colors']['default']
     color = formatted_color(color)
     fill = PatternFill(start_color=color,
                        end_color=color,
@@ -171,8 +178,9 @@ def set_default_color(worksheet, cell) -> None:
     worksheet[cell.coordinate].fill = fill
 
 
-def set_column_header_color(worksheet, cell) -> None:
-    color: str = get_config()['cell_colors']['header']
+def set_column_header_color(worksheet, cell, color=None) -> None:
+    if color is None:
+        color: str = get_config()['cell_colors']['header']
     color = formatted_color(color)
     fill = PatternFill(start_color=color,
                        end_color=color,
@@ -180,7 +188,7 @@ def set_column_header_color(worksheet, cell) -> None:
     worksheet[cell.coordinate].fill = fill
 
 
-def freeze(worksheet, columns: int, rows: int) -> None:
+def freeze(worksheet, columns: int, rows: int, show_progress=True) -> None:
     if rows <= 0 or columns <= 0:
         print('Incorrect number of rows or columns entered', file=sys.stderr)
         return None
@@ -188,7 +196,8 @@ def freeze(worksheet, columns: int, rows: int) -> None:
     rows += 1
     column = convert_to_column_name(columns)
     worksheet.freeze_panes = column+str(rows)
-    print(f'{columns} columns and {rows} rows have been freeze')
+    if show_progress:
+        print(f'{columns} columns and {rows} rows have been freeze')
 
 
 def set_font(cell, size: int, is_bold=False, color=None) -> None:
@@ -0,0 +1,218 @@
+import os
+import re
+import json
+import hashlib
+import inspect
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import openpyxl
+from openpyxl import Workbook
+from openpyxl.styles import Font
+import pandas as pd
+from tqdm import tqdm
+import excel_style as es
+from config import get_config
+
+
+"""=== Functions for naming and hashing the shards ==="""
+
+
+def shard_name(name: str) -> str:
+    """ The entity name is converted into the name usable as file name and worksheet name
+    Characters which are not allowed by the file system or by excel are replaced with '_'
+    Example:
+        'W311-H1/H2' => 'W311-H1_H2'
+    """
+    name = re.sub(r'[^\w\-. ]', '_', str(name)).strip()
+    return name if len(name) > 0 else '_'
+
+
+def get_shard_file_names(names: list[str]) -> dict:
+    """ The file names of the shards have to be unique on the case-insensitive file systems
+    The names which collide after shard_name() and case folding get a short hash of the original name
+    Example:
+        ['W502G', 'W502g'] => {'W502G': 'W502G_1a2b3c', 'W502g': 'W502g_4d5e6f'}
+    """
+    file_names: dict = {name: shard_name(name) for name in names}
+    collisions: dict = {}
+    for name, file_name in file_names.items():
+        collisions.setdefault(file_name.casefold(), []).append(name)
+    for colliding_names in collisions.values():
+        if len(colliding_names) == 1:
+            continue
+        for name in colliding_names:
+            name_hash: str = hashlib.sha256(str(name).encode('utf-8')).hexdigest()[:6]
+            file_names[name] = file_names[name] + '_' + name_hash
+    return file_names
+
+
+def get_shard_columns(df: pd.DataFrame, name: str) -> list[str]:
+    """ Select the columns of the timetable which belong to one staff member or venue
+    The format:
+    ['Session', 'Week', 'Day', 'Venue1', 'Venue1(Hours:total)', 'Venue1(Student Number:total)']
+    """
+    statistics_cols: list[str] = [get_config()['output_hours_num_col'], get_config()['output_student_num_col']]
+    # statistics columns were renamed to "Venue1(Hours:total)", so only the opening part is compared
+    prefixes: list[str] = [name + col[:len(col) - 1] for col in statistics_cols]
+    entity_cols: list[str] = [col for col in df.columns
+                              if col == name
+                              or any(str(col).startswith(prefix) for prefix in prefixes)]
+    fixed_cols: list[str] = [col for col in ['Session', 'Week', 'Day'] if col in df.columns]
+    return fixed_cols + entity_cols
+
+
+def get_style_fingerprint() -> str:
+    """ The style of the shards depends on the config values and on the styling code
+    Both are part of the fingerprint, so the shards are restyled when any of them changes
+    """
+    config = get_config()
+    style_keys: list[str] = ['cell_colors', 'font_size', 'is_bold', 'freeze_columns', 'freeze_rows',
+                             'output_hours_num_col', 'output_student_num_col']
+    style_config: str = json.dumps({key: config.get(key) for key in style_keys}, sort_keys=True)
+    style_code: str = inspect.getsource(es) + inspect.getsource(write_shard)
+    return hashlib.sha256((style_config + style_code).encode('utf-8')).hexdigest()
+
+
+def get_shard_hash(df: pd.DataFrame, style_fingerprint: str) -> str:
+    """ The content hash of the shard is used to skip the shards which have not been changed
+    since the last run. The bookings, holidays, totals and the style are all part of the hashed content.
+    """
+    content: str = style_fingerprint + df.to_csv()
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def load_shard_hashes(path: str) -> dict:
+    """ var hashes has the following format:
+    {
+        'Staff/staff_name1': 'sha256 hex digest',
+        'Venue/venue1': 'sha256 hex digest'
+    }
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as stream:
+        return json.load(stream)
+
+
+def save_shard_hashes(path: str, hashes: dict) -> None:
+    with open(path, 'w') as stream:
+        json.dump(hashes, stream, indent=4, sort_keys=True)
+
+
+"""=== Functions for writing the shards ==="""
+
+
+def write_shard(df: pd.DataFrame, path: str, sheet_name: str) -> str:
+    """ The function is saving the timetable of one staff member or venue into its own workbook
+    and applies the same style as the single workbook output.
+    It is executed by the worker processes, so all arguments have to be picklable.
+    """
+    df.to_excel(path, sheet_name=sheet_name)
+    workbook: Workbook = openpyxl.load_workbook(filename=path, read_only=False)
+    ws = workbook[sheet_name]
+    es.adjust_text_alignment(worksheet=ws, show_progress=False)
+    es.autoresize_columns(worksheet=ws, show_progress=False)
+    es.freeze(worksheet=ws, columns=get_config()['freeze_columns'], rows=get_config()['freeze_rows'],
+              show_progress=False)
+    workbook.save(filename=path)
+    return path
+
+
+def get_index_entry(df: pd.DataFrame, name: str, file_path: str) -> dict:
+    """ The function returns the row of the index workbook
+    The format:
+    {'Name': 'Venue1', 'Hours': 12, 'Student Number': 0, 'Workbook': 'Venue/Venue1.xlsx'}
+    """
+    entry = {'Name': name}
+    for col in df.columns:
+        col = str(col)
+        if not col.startswith(name + '('):
+            continue
+        suffix: str = col[len(name):]
+        label: str = suffix.strip('()').split(':')[0]
+        entry[label] = int(es.format_statistics_column_header(suffix))
+    entry['Workbook'] = file_path
+    return entry
+
+
+def write_shards(timetables: dict[str, pd.DataFrame], entity_names: dict[str, list[str]]) -> dict[str, list[dict]]:
+    """ The timetables are split into one workbook per staff member and venue.
+    The workbooks are written concurrently by the pool of worker processes.
+    Shards with the same content hash as in the previous run are skipped,
+    and the shards of the staff members and venues which are no longer in the input are deleted.
+    :return index entries per target column
+    """
+    shard_dir: str = get_config()['shard_dir']
+    hashes_path: str = os.path.join(shard_dir, 'shard_hashes.json')
+    os.makedirs(shard_dir, exist_ok=True)
+    previous_hashes: dict = load_shard_hashes(hashes_path)
+    style_fingerprint: str = get_style_fingerprint()
+    hashes = {}
+    index_entries = {}
+    """ ==== Prepare the shards ==== """
+    pending: list[tuple[pd.DataFrame, str, str]] = []
+    for target_column, df in timetables.items():
+        os.makedirs(os.path.join(shard_dir, target_column), exist_ok=True)
+        index_entries[target_column] = []
+        file_names: dict = get_shard_file_names(entity_names[target_column])
+        for name in entity_names[target_column]:
+            shard_df: pd.DataFrame = df[get_shard_columns(df, name)]
+            file_name: str = file_names[name]
+            relative_path: str = target_column + '/' + file_name + '.xlsx'
+            path: str = os.path.join(shard_dir, target_column, file_name + '.xlsx')
+            shard_hash: str = get_shard_hash(shard_df, style_fingerprint=style_fingerprint)
+            hashes[relative_path] = shard_hash
+            index_entries[target_column].append(get_index_entry(shard_df, name=name, file_path=relative_path))
+            if previous_hashes.get(relative_path) == shard_hash and os.path.exists(path):
+                continue  # the bookings of this shard have not been changed
+            pending.append((shard_df, path, shard_name(name)[:31]))  # excel limits sheet names to 31 characters
+    print(f'{len(pending)} shards to write, {len(hashes) - len(pending)} unchanged shards skipped')
+    """ ==== Delete the shards which are no longer in the input ==== """
+    for relative_path in previous_hashes.keys():
+        path: str = os.path.join(shard_dir, *relative_path.split('/'))
+        if relative_path not in hashes and os.path.exists(path):
+            os.remove(path)
+            print(f'Shard "{relative_path}" has been deleted')
+    """ ==== Write the shards concurrently ==== """
+    if len(pending) > 0:
+        bar: tqdm = tqdm(total=len(pending), disable=False)
+        with ProcessPoolExecutor(max_workers=get_config()['shard_workers']) as executor:
+            futures = [executor.submit(write_shard, shard_df, path, sheet_name)
+                       for shard_df, path, sheet_name in pending]
+            for future in as_completed(futures):
+                future.result()  # raise the exception of the worker, if any
+                bar.update()
+        bar.close()
+    save_shard_hashes(hashes_path, hashes)
+    return index_entries
+
+
+def write_index(index_entries: dict[str, list[dict]], path: str) -> None:
+    """ The index workbook contains one worksheet per target column
+    Each row links to the workbook of one staff member or venue
+    """
+    workbook = Workbook()
+    workbook.remove(workbook.active)  # remove the default empty worksheet
+    link_font = Font(color='FF0563C1', underline='single')
+    for target_column, entries in index_entries.items():
+        ws = workbook.create_sheet(title=target_column)
+        headers: list[str] = []
+        for entry in entries:
+            new_headers = [key for key in entry.keys() if key not in headers]
+            headers.extend(new_headers)
+        # keep the link to the workbook as the last column
+        headers = [header for header in headers if header != 'Workbook'] + ['Workbook']
+        ws.append(headers)
+        for entry in entries:
+            ws.append([entry.get(header) for header in headers])
+            cell = ws.cell(row=ws.max_row, column=len(headers))
+            cell.hyperlink = entry['Workbook']
+            cell.font = link_font
+        es.freeze(worksheet=ws, columns=1, rows=1, show_progress=False)
+    workbook.save(filename=path)
+
+
+def write_sharded_output(timetables: dict[str, pd.DataFrame], entity_names: dict[str, list[str]]) -> None:
+    index_entries = write_shards(timetables, entity_names)
+    index_path: str = os.path.join(get_config()['shard_dir'], 'index.xlsx')
+    write_index(index_entries, path=index_path)
+    print(10 * '=' + 'INDEX OF THE CLASS TIMETABLES HAS BEEN SAVED' + '=' * 10)
@@ -0,0 +1,172 @@
+import sys
+import numpy as np
+import pandas as pd
+from config import get_config
+
+
+"""=== Functions for defining the time slots ==="""
+
+
+def to_minutes(values: pd.Series) -> np.ndarray:
+    """ The time of the day is converted into the number of minutes since midnight
+    The values can be datetime.time or strings in the format HH:MM or HH:MM:SS
+    Example:
+        08:30 => 510
+        24:00 => 1440
+    """
+    text: pd.Series = values.astype(str).str.strip()
+    text = text.where(text.str.count(':') == 2, text + ':00')  # HH:MM => HH:MM:SS
+    minutes: pd.Series = pd.to_timedelta(text).dt.total_seconds() // 60
+    return minutes.to_numpy(dtype=np.int32)
+
+
+def get_time_slots() -> pd.DataFrame:
+    """
+    The function returns the time slots of one day defined in the config file
+    Each slot covers the minutes [Start, End) and the slots are sorted by the start time
+    The format:
+    Session | Start | End
+    'AM'    | 0     | 720
+    'PM'    | 720   | 1440
+    Named periods are used as they are, while the slots of fixed length
+    are named by their start time, for example '08:30'
+    """
+    time_slots: dict = get_config()['time_slots']
+    if time_slots['type'] == 'periods':
+        periods: dict = time_slots['periods']
+        slots = pd.DataFrame({'Session': list(periods.keys()),
+                              'Start': to_minutes(pd.Series([period[0] for period in periods.values()])),
+                              'End': to_minutes(pd.Series([period[1] for period in periods.values()]))})
+    elif time_slots['type'] == 'minutes':
+        day_start, day_end = to_minutes(pd.Series([time_slots['day_start'], time_slots['day_end']]))
+        starts: np.ndarray = np.arange(day_start, day_end, time_slots['minutes'], dtype=np.int32)
+        ends: np.ndarray = np.minimum(starts + time_slots['minutes'], day_end)
+        names: list[str] = [f'{start // 60:02d}:{start % 60:02d}' for start in starts]
+        slots = pd.DataFrame({'Session': names, 'Start': starts, 'End': ends})
+    else:
+        raise Exception(f'Unknown type of time slots: "{time_slots["type"]}"')
+    slots = slots.sort_values(by='Start', ignore_index=True)
+    if (slots['Start'].to_numpy()[1:] < slots['End'].to_numpy()[:-1]).any():
+        raise Exception('Time slots cannot overlap')
+    return slots
+
+
+"""=== Functions for mapping bookings onto the slot grid ==="""
+
+
+def get_slot_ranges(start: np.ndarray, end: np.ndarray, slots: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    """ Each booking [start, end) is mapped to the range of slots it overlaps: first..last (inclusive)
+    The booking outside all the slots gets last < first
+    Example with AM = [0, 720) and PM = [720, 1440):
+        08:30-12:15 => (0, 1)
+        08:30-12:00 => (0, 0)
+    """
+    slot_starts: np.ndarray = slots['Start'].to_numpy()
+    slot_ends: np.ndarray = slots['End'].to_numpy()
+    first: np.ndarray = np.searchsorted(slot_ends, start, side='right')
+    last: np.ndarray = np.searchsorted(slot_starts, end, side='left') - 1
+    return first, last
+
+
+def expand_slot_ranges(first: np.ndarray, last: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """ The ranges of slots are expanded into one element per occupied slot
+    :return (booking index, slot index)
+    Example:
+        first = [0, 2], last = [1, 2] => ([0, 0, 1], [0, 1, 2])
+    """
+    lengths: np.ndarray = np.maximum(last - first + 1, 0)
+    booking_index: np.ndarray = np.repeat(np.arange(len(first)), lengths)
+    # position of each element within its own range
+    offsets: np.ndarray = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    slot_index: np.ndarray = first[booking_index] + offsets
+    return booking_index, slot_index
+
+
+def build_slot_grid(df: pd.DataFrame, target_column: str, slots: pd.DataFrame) -> dict:
+    """
+    The bookings are stored in dense integer arrays with the shape (resources, dates, slots)
+    where the resources are the staff names or venue names of target_column
+    var grid has the following format:
+    {
+        'resources': ['staff_name1', 'staff_name2'],
+        'dates': [yyyy-mm-dd, yyyy-mm-dd],
+        'occupancy': number of bookings per slot,
+        'minutes': booked minutes per slot,
+        'students': number of students per slot, counted in the first slot of the booking,
+        'bookings': (booking index, resource index, date index, slot index) of each occupied slot,
+        'intervals': (resource index, date index, start, end) of each booking in minutes
+    }
+    """
+    resources, resource_index = np.unique(df[target_column].astype(str).to_numpy(), return_inverse=True)
+    dates, date_index = np.unique(pd.to_datetime(df['Date']).to_numpy(dtype='datetime64[D]'), return_inverse=True)
+    start: np.ndarray = to_minutes(df['Start'])
+    end: np.ndarray = to_minutes(df['End'])
+    first, last = get_slot_ranges(start, end, slots)
+    """ ==== Fill the grid by the occupied slots ==== """
+    intervals = (resource_index, date_index, start, end)
+    booking_index, slot_index = expand_slot_ranges(first, last)
+    resource_index = resource_index[booking_index]
+    date_index = date_index[booking_index]
+    shape = (len(resources), len(dates), len(slots))
+    occupancy = np.zeros(shape, dtype=np.int32)
+    np.add.at(occupancy, (resource_index, date_index, slot_index), 1)
+    # overlap of the booking with the slot in minutes
+    overlap: np.ndarray = (np.minimum(end[booking_index], slots['End'].to_numpy()[slot_index])
+                           - np.maximum(start[booking_index], slots['Start'].to_numpy()[slot_index]))
+    minutes = np.zeros(shape, dtype=np.int32)
+    np.add.at(minutes, (resource_index, date_index, slot_index), overlap)
+    # the minutes of the booking outside of the slots, e.g. before day_start, are not counted
+    covered: np.ndarray = np.bincount(booking_index, weights=overlap, minlength=len(start))
+    truncated: int = int((covered < end - start).sum())
+    if truncated > 0:
+        print(f'{truncated} bookings are not fully covered by the time slots, '
+              f'their hours outside of the slots are not counted', file=sys.stderr)
+    students = np.zeros(shape, dtype=np.int32)
+    is_first_slot: np.ndarray = (slot_index == first[booking_index])
+    np.add.at(students,
+              (resource_index[is_first_slot], date_index[is_first_slot], slot_index[is_first_slot]),
+              get_students_numbers(df)[booking_index[is_first_slot]])
+    return {'resources': list(resources),
+            'dates': dates,
+            'occupancy': occupancy,
+            'minutes': minutes,
+            'students': students,
+            'bookings': (booking_index, resource_index, date_index, slot_index),
+            'intervals': intervals}
+
+
+def get_students_numbers(df: pd.DataFrame) -> np.ndarray:
+    """Function tries to find the column which should include the number of the students in the venue"""
+    column_name: str = get_config()['input_student_num_col']
+    if len(column_name) == 0:
+        return np.zeros(df.shape[0], dtype=np.int32)
+    column_name = column_name.strip('()')
+    return df[column_name].fillna(0).to_numpy(dtype=np.int32)
+
+
+"""=== Functions for statistical analysis of the grid ==="""
+
+
+def get_clashes(grid: dict) -> pd.DataFrame:
+    """ The bookings of the same staff member or venue which overlap in time on the same day
+    Sharing a time slot is not a clash: 10:30-11:30 and 11:30-12:30 are both in the AM slot.
+    The bookings are sorted by (resource, date, start), and the booking is a clash
+    when it starts before the latest end of the previous bookings in its group.
+    The format:
+    Resource | Date       | Start | End
+    str      | yyyy-mm-dd | hh:mm | hh:mm
+    """
+    resource_index, date_index, start, end = grid['intervals']
+    order: np.ndarray = np.lexsort((start, date_index, resource_index))
+    resource_index, date_index = resource_index[order], date_index[order]
+    start, end = start[order], end[order]
+    group: np.ndarray = resource_index.astype(np.int64) * len(grid['dates']) + date_index
+    # latest end within each group, the groups are separated by an offset larger than a day in minutes
+    offset: np.ndarray = group * 2 * 24 * 60
+    latest_end: np.ndarray = np.maximum.accumulate(end + offset) - offset
+    is_clash: np.ndarray = np.zeros(len(order), dtype=bool)
+    is_clash[1:] = (group[1:] == group[:-1]) & (start[1:] < latest_end[:-1])
+    return pd.DataFrame({'Resource': np.asarray(grid['resources'], dtype=object)[resource_index[is_clash]],
+                         'Date': grid['dates'][date_index[is_clash]],
+                         'Start': [f'{minute // 60:02d}:{minute % 60:02d}' for minute in start[is_clash]],
+                         'End': [f'{minute // 60:02d}:{minute % 60:02d}' for minute in end[is_clash]]})